@@ -1,9 +1,15 @@
 """Library to handle connection with met.no api."""
 import asyncio
+import bisect
 import datetime
+import email.utils
+import functools
+import json
 import logging
+import urllib.parse
 
-from typing import Any, List
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
 import async_timeout
@@ -13,6 +19,11 @@ try:
 except ImportError:
     ciso8601 = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # https://api.met.no/weatherapi/weathericon/_/documentation/#___top
 CONDITIONS = {
     "clearsky": "sunny",
@@ -80,40 +91,146 @@ DEFAULT_API_URL = "https://api.met.no/weatherapi/locationforecast/2.0/complete"
 DEFAULT_AIRQUALITYFORECAST_API_URL = "https://api.met.no/weatherapi/airqualityforecast/0.1/"
 TIMEOUT = 30
 
+# Parameters read from the time entries by get_weather
+_COMMON_PARAMS = (
+    "symbol_code",
+    "air_pressure_at_sea_level",
+    "relative_humidity",
+    "wind_from_direction",
+)
+_HOURLY_PARAMS = _COMMON_PARAMS + (
+    "air_temperature",
+    "precipitation_amount",
+    "probability_of_precipitation",
+    "wind_speed",
+    "wind_speed_of_gust",
+    "cloud_area_fraction",
+    "dew_point_temperature",
+    "ultraviolet_index_clear_sky",
+)
+_DAILY_PARAMS = (
+    "air_temperature",
+    "wind_speed",
+    "wind_speed_of_gust",
+    "precipitation_amount",
+    "probability_of_precipitation",
+    "dew_point_temperature",
+    "ultraviolet_index_clear_sky",
+)
+
+
+def _to_km_per_hour(speed: float) -> float:
+    """Convert m/s to km/h."""
+    return round(speed * 3.6, 1)
+
+
+# Where each parameter is found in a time entry, and how to convert it
+_INSTANT, _NEXT_HRS_DETAILS, _NEXT_HRS_SUMMARY = range(3)
+_EXTRACTORS = {
+    "symbol_code": (_NEXT_HRS_SUMMARY, None),
+    "precipitation_amount": (_NEXT_HRS_DETAILS, None),
+    "precipitation_amount_max": (_NEXT_HRS_DETAILS, None),
+    "precipitation_amount_min": (_NEXT_HRS_DETAILS, None),
+    "probability_of_precipitation": (_NEXT_HRS_DETAILS, None),
+    "probability_of_thunder": (_NEXT_HRS_DETAILS, None),
+    "air_temperature": (_INSTANT, None),
+    "air_pressure_at_sea_level": (_INSTANT, None),
+    "relative_humidity": (_INSTANT, None),
+    "dew_point_temperature": (_INSTANT, None),
+    "ultraviolet_index_clear_sky": (_INSTANT, None),
+    "wind_speed": (_INSTANT, _to_km_per_hour),
+    "wind_speed_of_gust": (_INSTANT, _to_km_per_hour),
+    "wind_from_direction": (_INSTANT, None),
+    "fog_area_fraction": (_INSTANT, None),
+    "cloud_area_fraction": (_INSTANT, None),
+    "cloud_area_fraction_low": (_INSTANT, None),
+    "cloud_area_fraction_medium": (_INSTANT, None),
+    "cloud_area_fraction_high": (_INSTANT, None),
+}
+
+_JSON_LOADS = orjson.loads if orjson else json.loads
+
+# Air quality forecast variables, mapped to the keys used in AirQualityData
+_AIR_QUALITY_VARIABLES = {
+    "AQI": "aqi",
+    "pm10_concentration": "pm10_concentration",
+    "o3_concentration": "o3_concentration",
+    "no2_concentration": "no2_concentration",
+    "pm25_concentration": "pm25_concentration",
+}
+
 _LOGGER = logging.getLogger(__name__)
 
+_SHARED_SESSION = None
+_SHARED_SESSION_LOOP = None
+
+# Parsed forecasts by url: (expires, last_modified, etag, data)
+_RESPONSE_CACHE = {}
+_RESPONSE_CACHE_SIZE = 32
+
 
 class MetWeatherData:
     """Representation of met weather data."""
 
+    # pylint: disable=too-many-instance-attributes
+
     def __init__(self, urlparams, websession=None, api_url=DEFAULT_API_URL):
-        """Initialize the Weather object."""
+        """Initialize the Weather object.
+
+        Without a websession, a session shared by all objects in this module is
+        used. Close it with close_session().
+        """
         urlparams = {"lat": str(round(float(urlparams['lat']), 4)),
                      "lon": str(round(float(urlparams['lon']), 4)),
                      "altitude": str(int(float(urlparams.get('altitude', urlparams.get('msl', 0))))),
                      }
-        self._urlparams = urlparams
         self._api_url = api_url
-        if websession is None:
-
-            async def _create_session():
-                return aiohttp.ClientSession()
-
-            loop = asyncio.get_event_loop()
-            self._websession = loop.run_until_complete(_create_session())
-        else:
-            self._websession = websession
+        # The parameters never change, encode them once
+        self._url = "{}{}{}".format(api_url, "&" if "?" in api_url else "?", urllib.parse.urlencode(urlparams))
+        self._websession = websession
+        self._timestamps = []
+        self._dates = []
+        self._timestamps_data = None
+        self._daily_values = {}
         self.data = None
 
     async def fetching_data(self, *_):
         """Get the latest data from met.no."""
+        cached = _RESPONSE_CACHE.get(self._url)
+        headers = {}
+        if cached is not None:
+            expires, last_modified, etag, data = cached
+            if expires is not None and datetime.datetime.now(datetime.timezone.utc) < expires:
+                # The cached forecast is still valid
+                self.data = data
+                return True
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+            if etag is not None:
+                headers["If-None-Match"] = etag
+        websession = self._websession
+        if websession is None:
+            websession = await _get_session()
         try:
             async with async_timeout.timeout(TIMEOUT):
-                resp = await self._websession.get(self._api_url, params=self._urlparams)
+                resp = await websession.get(self._url, headers=headers)
+            if resp.status == 304 and cached is not None:
+                self.data = data
+                _cache_response(
+                    self._url,
+                    resp.headers,
+                    resp.headers.get("Last-Modified", last_modified),
+                    resp.headers.get("ETag", etag),
+                    data,
+                )
+                return True
             if resp.status >= 400:
                 _LOGGER.error("%s returned %s", self._api_url, resp.status)
                 return False
-            self.data = await resp.json()
+            self.data = await resp.json(loads=_JSON_LOADS)
+            _cache_response(
+                self._url, resp.headers, resp.headers.get("Last-Modified"), resp.headers.get("ETag"), self.data
+            )
         except (asyncio.TimeoutError, aiohttp.ClientError) as err:
             _LOGGER.error("Access to %s returned error '%s'", self._api_url, type(err).__name__)
             return False
@@ -155,160 +272,155 @@ class MetWeatherData:
 
     def get_weather(self, time, hourly=False):
         """Get the current weather data from met.no."""
-        # pylint: disable=too-many-locals
-        # pylint: disable=too-many-statements
         if self.data is None:
             return {}
 
-        day = time.astimezone().date()
-        daily_temperatures = []
-        daily_precipitation = []
-        daily_precipitation_probability = []
-        daily_windspeed = []
-        daily_windgust = []
-        daily_dew_point = []
-        daily_uv_index = []
-        entries = []
-
-        for time_entry in self.data["properties"]["timeseries"]:
-            timestamp = parse_datetime(time_entry["time"]).astimezone()
-            if timestamp.date() != day:
-                # Only get time window for current day
-                continue
-
-            # Collect all daily values to calculate min/max/sum
-            temperature = get_data("air_temperature", [time_entry])
-            if temperature is not None:
-                daily_temperatures.append(temperature)
-            wind_speed = get_data("wind_speed", [time_entry])
-            if wind_speed is not None:
-                daily_windspeed.append(wind_speed)
-            wind_speed_gust = get_data("wind_speed_of_gust", [time_entry])
-            if wind_speed_gust is not None:
-                daily_windgust.append(wind_speed_gust)
-            precipitation = get_data("precipitation_amount", [time_entry])
-            if precipitation is not None:
-                daily_precipitation.append(precipitation)
-            precipitation_probability = get_data("probability_of_precipitation", [time_entry])
-            if precipitation_probability is not None:
-                daily_precipitation_probability.append(precipitation_probability)
-            dew_point = get_data("dew_point_temperature", [time_entry])
-            if dew_point is not None:
-                daily_dew_point.append(dew_point)
-            uv_index = get_data("ultraviolet_index_clear_sky", [time_entry])
-            if uv_index is not None:
-                daily_uv_index.append(uv_index)
-
-            if time.astimezone() <= timestamp:
-                entries.append(time_entry)
-
-        if not entries:
+        local_time = time.astimezone()
+        day = local_time.date()
+
+        timestamps, dates = self._get_timestamps()
+        timeseries = self.data["properties"]["timeseries"]
+        # The timeseries is ordered by time, only get time window for current day
+        start = bisect.bisect_left(dates, day)
+        stop = bisect.bisect_right(dates, day, start)
+        # and the entries of that day from the requested time
+        first = bisect.bisect_left(timestamps, local_time, start, stop)
+        if first == stop:
             return {}
+
+        values = get_multiple_data(_HOURLY_PARAMS if hourly else _COMMON_PARAMS, timeseries[first:stop])
         res = dict()
         res["datetime"] = time.astimezone(tz=datetime.timezone.utc).isoformat()
-        res["condition"] = CONDITIONS.get(get_data("symbol_code", entries))
-        res["pressure"] = get_data("air_pressure_at_sea_level", entries)
-        res["humidity"] = get_data("relative_humidity", entries)
-        res["wind_bearing"] = get_data("wind_from_direction", entries)
+        res["condition"] = CONDITIONS.get(values["symbol_code"])
+        res["pressure"] = values["air_pressure_at_sea_level"]
+        res["humidity"] = values["relative_humidity"]
+        res["wind_bearing"] = values["wind_from_direction"]
         if hourly:
-            res["temperature"] = get_data("air_temperature", entries)
-            res["precipitation"] = get_data("precipitation_amount", entries)
-            res["precipitation_probability"] = get_data("probability_of_precipitation", entries)
-            res["wind_speed"] = get_data("wind_speed", entries)
-            res["wind_gust"] = get_data("wind_speed_of_gust", entries)
-            res["cloudiness"] = get_data("cloud_area_fraction", entries)
-            res["dew_point"] = get_data("dew_point_temperature", entries)
-            res["uv_index"] = get_data("ultraviolet_index_clear_sky", entries)
+            res["temperature"] = values["air_temperature"]
+            res["precipitation"] = values["precipitation_amount"]
+            res["precipitation_probability"] = values["probability_of_precipitation"]
+            res["wind_speed"] = values["wind_speed"]
+            res["wind_gust"] = values["wind_speed_of_gust"]
+            res["cloudiness"] = values["cloud_area_fraction"]
+            res["dew_point"] = values["dew_point_temperature"]
+            res["uv_index"] = values["ultraviolet_index_clear_sky"]
         else:
-            res["temperature"] = (
-                None if daily_temperatures == [] else max(daily_temperatures)
-            )
-            res["templow"] = (
-                None if daily_temperatures == [] else min(daily_temperatures)
-            )
-            res["precipitation"] = (
-                None if daily_precipitation == [] else round(sum(daily_precipitation), 1)
-            )
-            res["precipitation_probability"] = (
-                None if daily_precipitation_probability == [] else max(daily_precipitation_probability)
-            )
-            res["wind_speed"] = (
-                None if daily_windspeed == [] else max(daily_windspeed)
-            )
-            res["wind_gust"] = (
-                None if daily_windgust == [] else max(daily_windgust)
-            )
-            res["dew_point"] = (
-                None if daily_dew_point == [] else max(daily_dew_point)
-            )
-            res["uv_index"] = (
-                None if daily_uv_index == [] else max(daily_uv_index)
-            )
+            if day not in self._daily_values:
+                self._daily_values[day] = get_daily_data(timeseries[start:stop])
+            res.update(self._daily_values[day])
 
         return res
 
+    def _get_timestamps(self):
+        """Get the local timestamps and dates of the timeseries, parsed once per data set."""
+        if self._timestamps_data is not self.data:
+            self._timestamps = [
+                parse_datetime(time_entry["time"]).astimezone()
+                for time_entry in self.data["properties"]["timeseries"]
+            ]
+            self._dates = [timestamp.date() for timestamp in self._timestamps]
+            self._daily_values = {}
+            self._timestamps_data = self.data
+        return self._timestamps, self._dates
+
+
+def get_daily_data(data: List[dict]) -> Dict[str, Any]:
+    """Calculate min/max/sum of the weather parameters for a day."""
+    extractors = _get_extractors(_DAILY_PARAMS)
+    daily = {param: [] for param in _DAILY_PARAMS}
+
+    for time_entry in data:
+        try:
+            sources = _get_sources(time_entry)
+        except (ValueError, IndexError, KeyError):
+            continue
+        for param, source, convert in extractors:
+            values = sources[source]
+            if param not in values:
+                continue
+            new_state = values[param] if convert is None else convert(values[param])
+            if new_state is not None:
+                daily[param].append(new_state)
+
+    daily_temperatures = daily["air_temperature"]
+    res = dict()
+    res["temperature"] = (
+        None if not daily_temperatures else max(daily_temperatures)
+    )
+    res["templow"] = (
+        None if not daily_temperatures else min(daily_temperatures)
+    )
+    res["precipitation"] = (
+        None if not daily["precipitation_amount"] else round(sum(daily["precipitation_amount"]), 1)
+    )
+    res["precipitation_probability"] = (
+        None if not daily["probability_of_precipitation"] else max(daily["probability_of_precipitation"])
+    )
+    res["wind_speed"] = (
+        None if not daily["wind_speed"] else max(daily["wind_speed"])
+    )
+    res["wind_gust"] = (
+        None if not daily["wind_speed_of_gust"] else max(daily["wind_speed_of_gust"])
+    )
+    res["dew_point"] = (
+        None if not daily["dew_point_temperature"] else max(daily["dew_point_temperature"])
+    )
+    res["uv_index"] = (
+        None if not daily["ultraviolet_index_clear_sky"] else max(daily["ultraviolet_index_clear_sky"])
+    )
+    return res
+
 
 def get_data(param: str, data: List[dict]) -> Any:
     """Retrieve weather parameter."""
+    return get_multiple_data((param,), data)[param]
+
+
+def get_multiple_data(params: Tuple[str, ...], data: List[dict]) -> Dict[str, Any]:
+    """Retrieve several weather parameters with a single pass over the entries."""
+    res = dict.fromkeys(params)
+    missing = _get_extractors(params)
     try:
         for selected_time_entry in data:
+            sources = _get_sources(selected_time_entry)
+            for extractor in tuple(missing):
+                param, source, convert = extractor
+                values = sources[source]
+                if param not in values:
+                    continue
+                res[param] = values[param] if convert is None else convert(values[param])
+                missing.remove(extractor)
+            if not missing:
+                break
+    except (ValueError, IndexError, KeyError):
+        pass
+    return res
 
-            data = selected_time_entry["data"]
-            instant_details = data["instant"]["details"]
 
-            # Grab the highest resolution entity
-            next_hrs = (
-                    data.get("next_1_hours") or
-                    data.get("next_6_hours") or
-                    data.get("next_12_hours") or
-                    {}
-            )
-            next_hrs_details = next_hrs.get("details") or {}
-            next_hrs_summary = next_hrs.get("summary") or {}
+def _get_extractors(params: Tuple[str, ...]) -> List[tuple]:
+    """Resolve the (param, source, convert) extractors of the parameters.
 
-            new_state = None
+    Unknown parameters have no extractor, so they are always reported as None.
+    """
+    return [(param,) + _EXTRACTORS[param] for param in params if param in _EXTRACTORS]
 
-            if param == "symbol_code":
-                if param not in next_hrs_summary:
-                    continue
-                new_state = next_hrs_summary[param]
-
-            elif param in (
-                    "precipitation_amount",
-                    "precipitation_amount_max",
-                    "precipitation_amount_min",
-                    "probability_of_precipitation",
-                    "probability_of_thunder",
-            ):
-                if param not in next_hrs_details:
-                    continue
-                new_state = next_hrs_details[param]
 
-            elif param not in instant_details:
-                continue
-            elif param in (
-                    "air_temperature",
-                    "air_pressure_at_sea_level",
-                    "relative_humidity",
-                    "dew_point_temperature",
-                    "ultraviolet_index_clear_sky",
-            ):
-                new_state = instant_details[param]
-            elif param in ("wind_speed", "wind_speed_of_gust"):
-                new_state = round(instant_details[param] * 3.6, 1)
-            elif param == "wind_from_direction":
-                new_state = instant_details[param]
-            elif param in (
-                    "fog_area_fraction",
-                    "cloud_area_fraction",
-                    "cloud_area_fraction_low",
-                    "cloud_area_fraction_medium",
-                    "cloud_area_fraction_high",
-            ):
-                new_state = instant_details[param]
-            return new_state
-    except (ValueError, IndexError, KeyError):
-        return None
+def _get_sources(time_entry: dict) -> tuple:
+    """Get the parts of a time entry the parameters are read from, indexed by source."""
+    entry_data = time_entry["data"]
+
+    # Grab the highest resolution entity
+    next_hrs = (
+            entry_data.get("next_1_hours") or
+            entry_data.get("next_6_hours") or
+            entry_data.get("next_12_hours") or
+            {}
+    )
+    return (
+        entry_data["instant"]["details"],
+        next_hrs.get("details") or {},
+        next_hrs.get("summary") or {},
+    )
 
 
 class AirQualityData:
@@ -316,8 +428,12 @@ class AirQualityData:
 
     # pylint: disable=too-many-instance-attributes, too-few-public-methods
 
-    def __init__(self, coordinates, forecast, websession, api_url=DEFAULT_AIRQUALITYFORECAST_API_URL):
-        """Initialize the Air quality object."""
+    def __init__(self, coordinates, forecast, websession=None, api_url=DEFAULT_AIRQUALITYFORECAST_API_URL):
+        """Initialize the Air quality object.
+
+        Without a websession, a session shared by all objects in this module is
+        used. Close it with close_session().
+        """
         self._urlparams = coordinates
         self._urlparams["areaclass"] = "grunnkrets"
         self._forecast = forecast
@@ -327,63 +443,67 @@ class AirQualityData:
         self.units = dict()
         self._last_update = None
         self._data = dict()
+        self._valid_times = None
 
     async def update(self):
         """Update data."""
-        if self._last_update is None or datetime.datetime.now() - self._last_update > datetime.timedelta(3600):
+        # pylint: disable=too-many-locals, too-many-branches
+        if self._last_update is None or monotonic() - self._last_update > 3600:
+            websession = self._websession
+            if websession is None:
+                websession = await _get_session()
             try:
                 async with async_timeout.timeout(10):
-                    resp = await self._websession.get(
+                    resp = await websession.get(
                         self._api_url, params=self._urlparams
                     )
                 if resp.status >= 400:
                     _LOGGER.error("%s returned %s", self._api_url, resp.status)
                     return False
-                self._data = await resp.json()
+                self._data = await resp.json(loads=_JSON_LOADS)
+                self._valid_times = None
+                self._last_update = monotonic()
             except (asyncio.TimeoutError, aiohttp.ClientError) as err:
                 _LOGGER.error("%s returned %s", self._api_url, err)
                 return False
         try:
-            forecast_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            forecast_time = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
                 hours=self._forecast
-            )
+            )).timestamp()
+
+            if self._valid_times is None:
+                # Parse the validity periods once per fetched forecast
+                self._valid_times = [
+                    (parse_datetime(_data["from"]).timestamp(), parse_datetime(_data["to"]).timestamp())
+                    for _data in self._data["data"]["time"]
+                ]
 
             data = None
             min_dist = 24 * 3600
-            for _data in self._data["data"]["time"]:
-                valid_from = parse_datetime(_data["from"])
-                valid_to = parse_datetime(_data["to"])
-
+            for (valid_from, valid_to), _data in zip(self._valid_times, self._data["data"]["time"]):
                 if forecast_time >= valid_to:
                     # Has already passed. Never select this.
                     continue
 
-                average_dist = abs((valid_to - forecast_time).total_seconds()) + abs(
-                    (valid_from - forecast_time).total_seconds()
-                )
+                average_dist = abs(valid_to - forecast_time) + abs(valid_from - forecast_time)
                 if average_dist < min_dist:
                     min_dist = average_dist
                     data = _data
             if not data:
                 return False
-            self.data["aqi"] = data.get("variables", {}).get("AQI", {}).get("value")
-            self.data["pm10_concentration"] = (
-                data.get("variables", {}).get("pm10_concentration", {}).get("value")
-            )
-            self.data["o3_concentration"] = (
-                data.get("variables", {}).get("o3_concentration", {}).get("value")
-            )
-            self.data["no2_concentration"] = (
-                data.get("variables", {}).get("no2_concentration", {}).get("value")
-            )
-            self.data["pm25_concentration"] = (
-                data.get("variables", {}).get("pm25_concentration", {}).get("value")
-            )
+            variables = data.get("variables") or {}
+            state = (variables.get("AQI") or {}).get("value")
+            if state is None:
+                return False
+            for variable, name in _AIR_QUALITY_VARIABLES.items():
+                values = variables.get(variable) or {}
+                self.data[name] = values.get("value")
+                self.units[name] = values.get("units")
+            meta = self._data.get("meta") or {}
             self.data["location"] = "{}, {}".format(
-                self._data.get("meta", {}).get("location", {}).get("name"),
-                self._data.get("meta", {}).get("superlocation", {}).get("name"),
+                (meta.get("location") or {}).get("name"),
+                (meta.get("superlocation") or {}).get("name"),
             )
-            state = data.get("variables", {}).get("AQI", {}).get("value")
             if state < 2:
                 level = "low"
             elif state < 3:
@@ -392,30 +512,57 @@ class AirQualityData:
                 level = "high"
             self.data["level"] = level
 
-            self.units["aqi"] = data.get("variables", {}).get("AQI", {}).get("units")
-            self.units["pm10_concentration"] = (
-                data.get("variables", {}).get("pm10_concentration", {}).get("units")
-            )
-            self.units["o3_concentration"] = (
-                data.get("variables", {}).get("o3_concentration", {}).get("units")
-            )
-            self.units["no2_concentration"] = (
-                data.get("variables", {}).get("no2_concentration", {}).get("units")
-            )
-            self.units["pm25_concentration"] = (
-                data.get("variables", {}).get("pm25_concentration", {}).get("units")
-            )
-            self.units["aqi"] = data.get("variables", {}).get("AQI", {}).get("value")
-
         except IndexError as err:
-            _LOGGER.error("%s returned %s", resp.url, err)
+            _LOGGER.error("%s returned %s", self._api_url, err)
             return False
         return True
 
 
-
-
-
+def _cache_response(url, headers, last_modified, etag, data):
+    """Store a parsed forecast in the response cache, unless the server forbids it."""
+    _RESPONSE_CACHE.pop(url, None)
+    cache_control = _parse_cache_control(headers)
+    if "no-store" in cache_control:
+        return
+    if len(_RESPONSE_CACHE) >= _RESPONSE_CACHE_SIZE:
+        # Drop the least recently stored forecast
+        del _RESPONSE_CACHE[next(iter(_RESPONSE_CACHE))]
+    _RESPONSE_CACHE[url] = (_get_expires(headers, cache_control), last_modified, etag, data)
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Get the shared websession, create it on first use in each event loop."""
+    global _SHARED_SESSION, _SHARED_SESSION_LOOP  # pylint: disable=global-statement
+    loop = asyncio.get_running_loop()
+    if _SHARED_SESSION is None or _SHARED_SESSION.closed or _SHARED_SESSION_LOOP is not loop:
+        # A session can only be used in the event loop it was created in
+        _SHARED_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=10)
+        )
+        _SHARED_SESSION_LOOP = loop
+    return _SHARED_SESSION
+
+
+async def close_session():
+    """Close the shared websession of the running event loop."""
+    global _SHARED_SESSION, _SHARED_SESSION_LOOP  # pylint: disable=global-statement
+    if _SHARED_SESSION is not None and _SHARED_SESSION_LOOP is asyncio.get_running_loop():
+        await _SHARED_SESSION.close()
+    _SHARED_SESSION = None
+    _SHARED_SESSION_LOOP = None
+
+
+async def refresh_all(*sources) -> List[bool]:
+    """Refresh MetWeatherData and AirQualityData objects concurrently."""
+    return await asyncio.gather(
+        *(
+            source.fetching_data() if isinstance(source, MetWeatherData) else source.update()
+            for source in sources
+        )
+    )
+
+
+@functools.lru_cache(maxsize=1024)
 def parse_datetime(dt_str: str) -> datetime.datetime:
     """Parse datetime."""
     if ciso8601:
@@ -423,6 +570,45 @@ def parse_datetime(dt_str: str) -> datetime.datetime:
             return ciso8601.parse_datetime(dt_str)
         except ValueError:
             pass
-    date_format = "%Y-%m-%dT%H:%M:%S %z"
-    dt_str = dt_str.replace("Z", " +0000")
-    return datetime.datetime.strptime(dt_str, date_format)
+    if dt_str[-1:] == "Z":
+        dt_str = dt_str[:-1] + "+00:00"
+    return datetime.datetime.fromisoformat(dt_str)
+
+
+def _parse_cache_control(headers) -> Dict[str, str]:
+    """Parse the Cache-Control header into a dict of directive arguments."""
+    directives = {}
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, argument = directive.strip().partition("=")
+        directives[name.lower()] = argument
+    return directives
+
+
+def _get_expires(headers, cache_control: Dict[str, str]) -> Optional[datetime.datetime]:
+    """Get expiry time from Cache-Control max-age or Expires headers, None if missing."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if "no-cache" in cache_control:
+        # Revalidate on every fetch
+        return now
+    if "max-age" in cache_control:
+        try:
+            # max-age counts from when the response was generated, not received
+            max_age = int(cache_control["max-age"]) - int(headers.get("Age", 0))
+        except ValueError:
+            pass
+        else:
+            return now + datetime.timedelta(seconds=max_age)
+    return _parse_http_date(headers.get("Expires"))
+
+
+def _parse_http_date(date_str: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse HTTP date header, return None if missing or invalid."""
+    if not date_str:
+        return None
+    try:
+        parsed = email.utils.parsedate_to_datetime(date_str)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
@@ -3,7 +3,8 @@ from setuptools import setup
 setup(
     name = 'PyMetno',
     packages = ['metno'],
-    install_requires=['xmltodict', "aiohttp>=3.0.6", "async_timeout>=3.0.0"],
+    python_requires='>=3.7',
+    install_requires=["aiohttp>=3.0.6", "async_timeout>=3.0.0"],
     version = '0.13.0',
     description = 'A library to communicate with the met.no api',
     author='Daniel Hjelseth Høyer',